@@ -5,13 +5,18 @@ Content Share WebUI - 内容分享工具
 """
 
 import os
+import re
+import copy
 import sqlite3
 import secrets
-from datetime import datetime, timedelta
+import hashlib
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 
 import yaml
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, abort, Response
+from flask import Flask, render_template, stream_with_context, request, redirect, url_for, session, jsonify, abort, Response, make_response
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.http import is_resource_modified
 
 # =============================================================================
 # 配置加载
@@ -19,10 +24,30 @@ from flask import Flask, render_template, request, redirect, url_for, session, j
 
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')
 
+MIN_ID_LENGTH = 4
+SHORT_ID_PATTERN = re.compile(r'^[a-zA-Z0-9_-]+$')  # 短 ID 和自定义链接允许的字符
+
+def validate_config(cfg):
+    """验证配置，返回错误信息（合法时返回 None）"""
+    content = cfg.get('content', {})
+    if 'id_length' in content:
+        id_length = content['id_length']
+        if not isinstance(id_length, int) or isinstance(id_length, bool) or id_length < MIN_ID_LENGTH:
+            return f'content.id_length 必须是不小于 {MIN_ID_LENGTH} 的整数'
+    if 'id_alphabet' in content:
+        alphabet = content['id_alphabet']
+        if not isinstance(alphabet, str) or not SHORT_ID_PATTERN.match(alphabet) or len(set(alphabet)) < 2:
+            return 'content.id_alphabet 只能包含字母、数字、下划线和连字符，且至少包含 2 个不同字符'
+    return None
+
 def load_config():
     """加载配置文件"""
     with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        loaded = yaml.safe_load(f)
+    error = validate_config(loaded)
+    if error:
+        raise ValueError(f'配置文件无效: {error}')
+    return loaded
 
 def save_config(new_config):
     """保存配置文件"""
@@ -41,9 +66,21 @@ def reload_config():
 # Flask 应用初始化
 # =============================================================================
 
+TEMPLATE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jinja_cache')
+PRECOMPILED_TEMPLATES = ('index.html', 'view.html', 'login.html')
+
 app = Flask(__name__)
 app.secret_key = config['server']['secret_key']
 
+# 模板字节码持久化缓存，新 worker 启动时无需重新编译模板
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)}
+
+def warm_templates():
+    """预加载模板（首次编译后写入字节码缓存）"""
+    for name in PRECOMPILED_TEMPLATES:
+        app.jinja_env.get_template(name)
+
 # =============================================================================
 # 数据库操作
 # =============================================================================
@@ -67,6 +104,8 @@ def init_db():
     """初始化数据库"""
     conn = get_db_connection()
     c = conn.cursor()
+    # WAL 模式下读操作不阻塞写操作（首页流式渲染期间游标会一直打开）
+    c.execute('PRAGMA journal_mode=WAL')
     c.execute('''
         CREATE TABLE IF NOT EXISTS contents (
             id TEXT PRIMARY KEY,
@@ -74,7 +113,11 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             expires_at TIMESTAMP,
             title TEXT,
-            render_mode TEXT DEFAULT 'raw'
+            render_mode TEXT DEFAULT 'raw',
+            version INTEGER DEFAULT 1,
+            etag TEXT,
+            updated_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            size INTEGER
         )
     ''')
     # 迁移：添加 render_mode 列（如果不存在）
@@ -82,12 +125,98 @@ def init_db():
         c.execute('ALTER TABLE contents ADD COLUMN render_mode TEXT DEFAULT "raw"')
     except sqlite3.OperationalError:
         pass  # 列已存在
+    # 迁移：添加 version 列（用于乐观并发控制）
+    try:
+        c.execute('ALTER TABLE contents ADD COLUMN version INTEGER DEFAULT 1')
+    except sqlite3.OperationalError:
+        pass  # 列已存在
+    # 迁移：添加 etag / updated_at 列（用于 HTTP 缓存校验）
+    for column in ('etag TEXT', 'updated_at TIMESTAMP'):
+        try:
+            c.execute(f'ALTER TABLE contents ADD COLUMN {column}')
+        except sqlite3.OperationalError:
+            pass  # 列已存在
+    c.execute('UPDATE contents SET updated_at = created_at WHERE updated_at IS NULL')
+    # 迁移：添加 size 列（正文字节数，追加时无需读取正文即可检查大小）
+    try:
+        c.execute('ALTER TABLE contents ADD COLUMN size INTEGER')
+    except sqlite3.OperationalError:
+        pass  # 列已存在
+    c.execute('UPDATE contents SET size = length(CAST(content AS BLOB)) WHERE size IS NULL')
+    # 追加的数据单独存放，读取时拼接到正文之后，超过阈值时合并回 contents
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS content_chunks (
+            seq INTEGER PRIMARY KEY,
+            content_id TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_content_chunks_content_id ON content_chunks (content_id, seq)')
+    for row in c.execute('SELECT id, content, title, render_mode, created_at FROM contents WHERE etag IS NULL').fetchall():
+        etag = compute_etag(row['content'], row['title'], row['render_mode'], row['created_at'])
+        conn.execute('UPDATE contents SET etag = ? WHERE id = ?', (etag, row['id']))
     conn.commit()
     conn.close()
 
-def generate_short_id():
-    """生成 8 位随机短 ID"""
-    return secrets.token_urlsafe(6)  # 生成 8 个 URL 安全字符
+DEFAULT_ID_LENGTH = 8
+DEFAULT_ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+ID_MAX_ATTEMPTS = 12
+ID_ATTEMPTS_PER_LENGTH = 3  # 连续冲突达到该次数后 ID 长度加 1
+
+def generate_short_id(length=None, alphabet=None):
+    """生成随机短 ID（长度和字符集可在配置中调整）"""
+    length = length or config['content'].get('id_length', DEFAULT_ID_LENGTH)
+    alphabet = alphabet or config['content'].get('id_alphabet', DEFAULT_ID_ALPHABET)
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
+
+def _try_insert_content(c, short_id, values):
+    """尝试插入内容，ID 冲突时返回 False（由主键唯一约束原子判断）"""
+    try:
+        c.execute(
+            '''INSERT INTO contents (id, content, title, expires_at, render_mode, etag, created_at, size, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))''',
+            (short_id, *values, len(values[0].encode('utf-8')))
+        )
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+# 各 (长度, 字符集) 组合下已增加的 ID 长度，避免 ID 空间饱和后每次创建都先经历必然的冲突
+_id_length_growth = {}
+
+def allocate_short_id(c, values, length=None, alphabet=None):
+    """分配唯一短 ID 并插入内容
+
+    每次尝试都是一次原子 INSERT，冲突时重试；连续冲突说明 ID 空间趋于饱和，
+    自动增加长度，并记住增加后的长度供后续分配直接使用。
+    """
+    length = length or config['content'].get('id_length', DEFAULT_ID_LENGTH)
+    alphabet = alphabet or config['content'].get('id_alphabet', DEFAULT_ID_ALPHABET)
+    key = (length, alphabet)
+    growth = _id_length_growth.get(key, 0)
+    for attempt in range(ID_MAX_ATTEMPTS):
+        extra = growth + attempt // ID_ATTEMPTS_PER_LENGTH
+        short_id = generate_short_id(length + extra, alphabet)
+        if _try_insert_content(c, short_id, values):
+            if extra > growth:
+                _id_length_growth[key] = extra
+                app.logger.warning('短 ID 空间接近饱和，已自动使用 %d 位 ID，建议调大 content.id_length',
+                                   length + extra)
+            return short_id
+    raise RuntimeError('无法分配唯一的短 ID')
+
+def compute_etag(content, title=None, render_mode='raw', created_at=None):
+    """计算内容的强 ETag（写入时计算并保存）
+
+    title、render_mode 和 created_at 会影响响应正文和 Content-Type，因此一并计入；
+    created_at 也使同一自定义 ID 删除后重建的内容得到不同的 ETag
+    """
+    payload = '\0'.join((render_mode or 'raw', title or '', str(created_at or ''), content))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def chain_etag(etag, data):
+    """基于旧 ETag 和追加数据计算新 ETag，无需读取完整正文"""
+    return hashlib.sha256((etag + data).encode('utf-8')).hexdigest()
 
 def is_expired(expires_at):
     """检查是否过期"""
@@ -99,41 +228,55 @@ def is_expired(expires_at):
 
 def save_content(content, title, expire_hours, custom_id=None, render_mode='raw'):
     """保存内容到数据库"""
-    short_id = custom_id if custom_id else generate_short_id()
     expires_at = None
     if expire_hours and expire_hours > 0:
         expires_at = datetime.now() + timedelta(hours=expire_hours)
     
+    # 与 CURRENT_TIMESTAMP 相同的 UTC 格式，显式写入以便计入 ETag
+    created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    values = (content, title, expires_at, render_mode, compute_etag(content, title, render_mode, created_at), created_at)
     conn = get_db_connection()
     c = conn.cursor()
     
-    # 检查自定义 ID 是否已存在
     if custom_id:
-        c.execute('SELECT id FROM contents WHERE id = ?', (custom_id,))
-        if c.fetchone():
-            conn.close()
-            return None  # ID 已存在
+        # 自定义 ID 已存在时插入失败，无需预先查询
+        short_id = custom_id if _try_insert_content(c, custom_id, values) else None
+    else:
+        short_id = allocate_short_id(c, values)
     
-    c.execute(
-        'INSERT INTO contents (id, content, title, expires_at, render_mode) VALUES (?, ?, ?, ?, ?)',
-        (short_id, content, title, expires_at, render_mode)
-    )
     conn.commit()
     conn.close()
     return short_id
 
+CHUNK_COMPACT_THRESHOLD = 256  # 追加块数量达到该值时合并回正文
+
+def _read_chunks(conn, short_id):
+    """读取尚未合并的追加数据"""
+    rows = conn.execute(
+        'SELECT data FROM content_chunks WHERE content_id = ? ORDER BY seq', (short_id,)
+    ).fetchall()
+    return ''.join(row['data'] for row in rows)
+
+def _compact_chunks(conn, short_id, body):
+    """将追加数据合并回正文（需在写事务中调用）"""
+    conn.execute('UPDATE contents SET content = ? WHERE id = ?', (body, short_id))
+    conn.execute('DELETE FROM content_chunks WHERE content_id = ?', (short_id,))
+
 def get_content(short_id):
     """获取内容（检查过期）"""
     conn = get_db_connection()
     c = conn.cursor()
+    c.execute('BEGIN')  # 正文和追加块在同一快照中读取
     c.execute('SELECT * FROM contents WHERE id = ?', (short_id,))
     row = c.fetchone()
+    chunks = _read_chunks(conn, short_id) if row is not None else ''
     conn.close()
     
     if row is None:
         return None
     
     content_dict = dict(row)
+    content_dict['content'] += chunks
     if is_expired(content_dict.get('expires_at')):
         # 过期则删除并返回 None
         delete_content(short_id)
@@ -141,30 +284,42 @@ def get_content(short_id):
     
     return content_dict
 
+def _fetch_content_meta(conn, short_id):
+    """获取内容元数据（不读取正文，不检查过期）"""
+    row = conn.execute(
+        'SELECT id, title, created_at, expires_at, render_mode, version, etag, updated_at FROM contents WHERE id = ?',
+        (short_id,)
+    ).fetchone()
+    return dict(row) if row is not None else None
+
+def _read_body(conn, short_id):
+    """读取完整正文（含尚未合并的追加数据）"""
+    base = conn.execute('SELECT content FROM contents WHERE id = ?', (short_id,)).fetchone()[0]
+    return base + _read_chunks(conn, short_id)
+
 def delete_content(short_id):
     """删除内容"""
     conn = get_db_connection()
     c = conn.cursor()
     c.execute('DELETE FROM contents WHERE id = ?', (short_id,))
+    c.execute('DELETE FROM content_chunks WHERE content_id = ?', (short_id,))
     conn.commit()
     conn.close()
 
-def list_contents():
-    """列出所有内容"""
+def iter_contents():
+    """逐行遍历所有未过期内容（服务端游标，不读取正文）"""
     conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM contents ORDER BY created_at DESC')
-    rows = c.fetchall()
-    conn.close()
-
-    # 过滤掉过期内容
-    result = []
-    for row in rows:
-        content_dict = dict(row)
-        if not is_expired(content_dict.get('expires_at')):
-            result.append(content_dict)
-
-    return result
+    try:
+        c = conn.cursor()
+        # rowid 递增顺序即创建顺序，按 rowid 倒序可直接遍历主键 B 树而无需排序
+        c.execute('SELECT id, title, created_at, expires_at FROM contents ORDER BY rowid DESC')
+        for row in c:
+            content_dict = dict(row)
+            # 过滤掉过期内容
+            if not is_expired(content_dict.get('expires_at')):
+                yield content_dict
+    finally:
+        conn.close()
 
 def update_content(short_id, content, title, expire_hours, render_mode='raw'):
     """更新现有内容"""
@@ -174,15 +329,118 @@ def update_content(short_id, content, title, expire_hours, render_mode='raw'):
 
     conn = get_db_connection()
     c = conn.cursor()
+    c.execute('BEGIN IMMEDIATE')
+    row = c.execute('SELECT created_at FROM contents WHERE id = ?', (short_id,)).fetchone()
+    if row is None:
+        conn.rollback()
+        conn.close()
+        return False
     c.execute('''
         UPDATE contents
-        SET content = ?, title = ?, expires_at = ?, render_mode = ?
+        SET content = ?, title = ?, expires_at = ?, render_mode = ?, version = version + 1,
+            etag = ?, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now'), size = ?
         WHERE id = ?
-    ''', (content, title, expires_at, render_mode, short_id))
-    updated = c.rowcount > 0
+    ''', (content, title, expires_at, render_mode, compute_etag(content, title, render_mode, row['created_at']),
+          len(content.encode('utf-8')), short_id))
+    c.execute('DELETE FROM content_chunks WHERE content_id = ?', (short_id,))
     conn.commit()
     conn.close()
-    return updated
+    return True
+
+def _lock_content_row(conn, short_id, expected_version):
+    """开启写事务并检查内容状态（不读取正文）
+
+    返回 (错误码, 行)，错误码为 None 表示可以继续写入
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute(
+        'SELECT expires_at, version, etag, size, title, render_mode, created_at FROM contents WHERE id = ?',
+        (short_id,)
+    ).fetchone()
+    if row is None or is_expired(row['expires_at']):
+        return 'not_found', row
+    if expected_version is not None and row['version'] != expected_version:
+        return 'conflict', row
+    return None, row
+
+def append_content(short_id, data, expected_version=None):
+    """在现有内容末尾追加数据
+
+    追加的数据写入 content_chunks，contents 行只更新定长的元数据列，
+    不会重写正文（仅当元数据的整数编码长度变化时，如 version 变为 2、128，SQLite 才会重写整行）；
+    块数量达到 CHUNK_COMPACT_THRESHOLD 时合并一次。
+    expected_version 不为 None 时进行乐观并发检查。
+    返回 (状态, 版本号)，状态为 'ok' / 'not_found' / 'conflict' / 'too_large'
+    """
+    data_size = len(data.encode('utf-8'))
+    conn = get_db_connection()
+    try:
+        error, row = _lock_content_row(conn, short_id, expected_version)
+        if error:
+            conn.rollback()
+            return error, row['version'] if row else None
+        if row['size'] + data_size > config['content']['max_content_size']:
+            conn.rollback()
+            return 'too_large', row['version']
+        conn.execute('INSERT INTO content_chunks (content_id, data) VALUES (?, ?)', (short_id, data))
+        conn.execute(
+            '''UPDATE contents
+               SET version = version + 1, etag = ?, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now'), size = size + ?
+               WHERE id = ?''',
+            (chain_etag(row['etag'], data), data_size, short_id)
+        )
+        chunk_count = conn.execute(
+            'SELECT COUNT(*) FROM content_chunks WHERE content_id = ?', (short_id,)
+        ).fetchone()[0]
+        if chunk_count >= CHUNK_COMPACT_THRESHOLD:
+            base = conn.execute('SELECT content FROM contents WHERE id = ?', (short_id,)).fetchone()[0]
+            _compact_chunks(conn, short_id, base + _read_chunks(conn, short_id))
+        conn.commit()
+        return 'ok', row['version'] + 1
+    finally:
+        conn.close()
+
+def replace_content_range(short_id, offset, length, data, expected_version=None):
+    """替换现有内容中 [offset, offset + length) 字节范围的数据
+
+    偏移量按 UTF-8 字节计算，范围不能截断多字节字符，替换后的内容不能为空。
+    返回 (状态, 版本号)，状态为 'ok' / 'not_found' / 'conflict' / 'too_large' / 'bad_range' / 'empty'
+    """
+    data_bytes = data.encode('utf-8')
+    conn = get_db_connection()
+    try:
+        error, row = _lock_content_row(conn, short_id, expected_version)
+        if error:
+            conn.rollback()
+            return error, row['version'] if row else None
+        if offset < 0 or length < 0 or offset + length > row['size']:
+            conn.rollback()
+            return 'bad_range', row['version']
+        new_size = row['size'] - length + len(data_bytes)
+        if new_size == 0:
+            conn.rollback()
+            return 'empty', row['version']
+        if new_size > config['content']['max_content_size']:
+            conn.rollback()
+            return 'too_large', row['version']
+        base = conn.execute('SELECT content FROM contents WHERE id = ?', (short_id,)).fetchone()[0]
+        body = (base + _read_chunks(conn, short_id)).encode('utf-8')
+        try:
+            new_content = (body[:offset] + data_bytes + body[offset + length:]).decode('utf-8')
+        except UnicodeDecodeError:
+            conn.rollback()
+            return 'bad_range', row['version']
+        _compact_chunks(conn, short_id, new_content)
+        conn.execute(
+            '''UPDATE contents
+               SET version = version + 1, etag = ?, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now'), size = ?
+               WHERE id = ?''',
+            (compute_etag(new_content, row['title'], row['render_mode'], row['created_at']), new_size, short_id)
+        )
+        conn.commit()
+        return 'ok', row['version'] + 1
+    finally:
+        conn.close()
 
 # =============================================================================
 # 认证装饰器
@@ -218,15 +476,22 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
+INDEX_STREAM_BUFFER_SIZE = 500  # 每个响应块包含的模板片段数
+
 @app.route('/')
 @login_required
 def index():
-    """管理主页"""
-    contents = list_contents()
-    return render_template('index.html', 
-                         contents=contents, 
-                         config=config,
-                         default_expire_hours=config['content']['default_expire_hours'])
+    """管理主页（流式渲染，历史记录逐行输出）"""
+    context = {
+        'contents': iter_contents(),
+        'config': config,
+        'default_expire_hours': config['content']['default_expire_hours'],
+    }
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template('index.html').stream(context)
+    # 合并模板片段后再输出，避免每个片段单独成为一个响应块
+    stream.enable_buffering(INDEX_STREAM_BUFFER_SIZE)
+    return Response(stream_with_context(stream))
 
 @app.route('/create', methods=['POST'])
 @login_required
@@ -253,8 +518,7 @@ def create():
     
     # 验证自定义 ID
     if custom_id:
-        import re
-        if not re.match(r'^[a-zA-Z0-9_-]+$', custom_id):
+        if not SHORT_ID_PATTERN.match(custom_id):
             return jsonify({'error': '自定义链接只能包含字母、数字、下划线和连字符'}), 400
         if len(custom_id) < 2 or len(custom_id) > 50:
             return jsonify({'error': '自定义链接长度需要在 2-50 个字符之间'}), 400
@@ -263,7 +527,10 @@ def create():
     if render_mode not in ('raw', 'html'):
         render_mode = 'raw'
     
-    short_id = save_content(content, title, expire_hours, custom_id or None, render_mode)
+    try:
+        short_id = save_content(content, title, expire_hours, custom_id or None, render_mode)
+    except RuntimeError:
+        return jsonify({'error': '无法生成唯一链接，请稍后重试或调大 content.id_length'}), 503
     
     if short_id is None:
         return jsonify({'error': f'自定义链接 "{custom_id}" 已被使用'}), 400
@@ -276,18 +543,85 @@ def create():
         'share_url': share_url
     })
 
+DEFAULT_CACHE_MAX_AGE = 60
+
+def _set_cache_headers(response, meta):
+    """设置 ETag、Last-Modified 和 Cache-Control
+
+    内容可以随时被编辑或删除，因此 max-age 取剩余有效期和 cache_max_age 中的较小值，
+    并要求缓存过期后重新校验
+    """
+    response.set_etag(meta['etag'])
+    last_modified = _last_modified(meta)
+    if last_modified is not None:
+        # 赋值 None 会被 werkzeug 当作当前时间，因此只在有值时设置
+        response.last_modified = last_modified
+    max_age = config['content'].get('cache_max_age', DEFAULT_CACHE_MAX_AGE)
+    expires_at = meta.get('expires_at')
+    if expires_at is not None:
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+        remaining = int((expires_at - datetime.now()).total_seconds())
+        max_age = min(max_age, max(remaining, 0))
+    if max_age > 0:
+        response.cache_control.max_age = max_age
+        response.cache_control.must_revalidate = True
+    else:
+        response.cache_control.no_cache = True
+    response.cache_control.public = True
+    return response
+
+def _parse_utc_timestamp(value):
+    """解析 SQLite 生成的 UTC 时间（可能为 NULL）"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc)
+
+def _last_modified(meta):
+    """计算 Last-Modified（精确到秒）
+
+    HTTP 日期只精确到秒，若最后一次写入发生在当前这一秒内，同一秒内的后续写入
+    会得到相同的 Last-Modified，导致 If-Modified-Since 误判为未修改；
+    因此这一秒内不发送 Last-Modified，只依赖 ETag。
+    """
+    updated_at = _parse_utc_timestamp(meta.get('updated_at'))
+    if updated_at is None:
+        return None
+    updated_at = updated_at.replace(microsecond=0)
+    if updated_at >= datetime.now(timezone.utc).replace(microsecond=0):
+        return None
+    return updated_at
+
 @app.route('/s/<short_id>')
 def view(short_id):
     """公开访问内容"""
-    content = get_content(short_id)
-    if content is None:
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN')  # 元数据和正文在同一快照中读取
+        content = _fetch_content_meta(conn, short_id)
+        expired = content is not None and is_expired(content['expires_at'])
+        if content is not None and not expired:
+            # 条件请求命中时直接返回 304，不读取正文
+            if not is_resource_modified(request.environ, etag=content['etag'],
+                                        last_modified=_last_modified(content)):
+                return _set_cache_headers(Response(status=304), content)
+            content['content'] = _read_body(conn, short_id)
+    finally:
+        conn.close()
+
+    if content is None or expired:
+        if expired:
+            delete_content(short_id)
         abort(404)
     
     render_mode = content.get('render_mode', 'raw')
     if render_mode == 'html':
-        return render_template('view.html', content=content)
+        response = make_response(render_template('view.html', content=content))
     else:
-        return Response(content['content'], mimetype='text/plain; charset=utf-8')
+        response = Response(content['content'], mimetype='text/plain; charset=utf-8')
+    return _set_cache_headers(response, content)
 
 @app.route('/delete/<short_id>', methods=['POST'])
 @login_required
@@ -308,7 +642,8 @@ def get_content_api(short_id):
         'title': content['title'] or '',
         'content': content['content'],
         'render_mode': content.get('render_mode', 'raw'),
-        'expires_at': content['expires_at']
+        'expires_at': content['expires_at'],
+        'version': content.get('version', 1)
     })
 
 @app.route('/update/<short_id>', methods=['POST'])
@@ -343,6 +678,64 @@ def update(short_id):
 
     return jsonify({'success': True})
 
+def _parse_expected_version():
+    """解析请求中的可选 version 参数"""
+    version = request.form.get('version', '').strip()
+    if not version:
+        return None
+    return int(version)
+
+def _partial_update_response(status, version):
+    """将增量更新结果转换为 JSON 响应"""
+    if status == 'ok':
+        return jsonify({'success': True, 'version': version})
+    if status == 'not_found':
+        return jsonify({'error': '内容不存在'}), 404
+    if status == 'conflict':
+        return jsonify({'error': '内容已被修改，请刷新后重试', 'version': version}), 409
+    if status == 'too_large':
+        max_size = config['content']['max_content_size']
+        return jsonify({'error': f'内容超过最大限制 ({max_size} bytes)'}), 400
+    if status == 'empty':
+        return jsonify({'error': '内容不能为空'}), 400
+    return jsonify({'error': '替换范围无效'}), 400
+
+@app.route('/append/<short_id>', methods=['POST'])
+@login_required
+def append(short_id):
+    """在现有内容末尾追加数据"""
+    data = request.form.get('content', '')
+    if not data:
+        return jsonify({'error': '内容不能为空'}), 400
+
+    try:
+        expected_version = _parse_expected_version()
+    except ValueError:
+        return jsonify({'error': 'version 必须是整数'}), 400
+
+    status, version = append_content(short_id, data, expected_version)
+    return _partial_update_response(status, version)
+
+@app.route('/replace/<short_id>', methods=['POST'])
+@login_required
+def replace_range(short_id):
+    """替换现有内容中的指定字节范围"""
+    data = request.form.get('content', '')
+
+    try:
+        offset = int(request.form.get('offset', ''))
+        length = int(request.form.get('length', ''))
+    except ValueError:
+        return jsonify({'error': 'offset 和 length 必须是整数'}), 400
+
+    try:
+        expected_version = _parse_expected_version()
+    except ValueError:
+        return jsonify({'error': 'version 必须是整数'}), 400
+
+    status, version = replace_content_range(short_id, offset, length, data, expected_version)
+    return _partial_update_response(status, version)
+
 @app.route('/config', methods=['GET', 'POST'])
 @login_required
 def config_page():
@@ -370,7 +763,7 @@ def config_page():
             return jsonify({'error': '无效的 JSON 数据'}), 400
         
         # 验证配置
-        updated_config = config.copy()
+        updated_config = copy.deepcopy(config)
         
         # 深度合并配置
         for section, values in new_values.items():
@@ -393,6 +786,15 @@ def config_page():
                                 value = bool(value)
                         updated_config[section][key] = value
         
+        error = validate_config(updated_config)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # 验证通过后再应用到当前配置
+        for section, values in updated_config.items():
+            if isinstance(values, dict) and isinstance(config.get(section), dict):
+                config[section].update(values)
+        
         # 保存配置
         save_config(updated_config)
         reload_config()
@@ -416,6 +818,7 @@ def config_page():
 
 # 确保数据库初始化
 init_db()
+warm_templates()
 
 if __name__ == '__main__':
     app.run(
@@ -1,13 +1,15 @@
 """pytest 配置和 fixtures"""
 import os
 import sys
+import json
 import tempfile
 import pytest
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app as flask_app, init_db, config
+import app as app_module
+from app import app as flask_app, init_db
 
 @pytest.fixture
 def app():
@@ -18,9 +20,9 @@ def app():
     flask_app.config['TESTING'] = True
     flask_app.config['WTF_CSRF_ENABLED'] = False
     
-    # 临时修改数据库路径
-    original_db_path = config['database']['path']
-    config['database']['path'] = db_path
+    # 临时修改数据库路径（reload_config 会替换 config 对象，因此通过模块访问）
+    original_db_path = app_module.config['database']['path']
+    app_module.config['database']['path'] = db_path
     
     # 初始化数据库
     init_db()
@@ -28,9 +30,13 @@ def app():
     yield flask_app
     
     # 清理
-    config['database']['path'] = original_db_path
+    app_module.config['database']['path'] = original_db_path
     os.close(db_fd)
     os.unlink(db_path)
+    # WAL 模式下的附属文件
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
 
 @pytest.fixture
 def client(app):
@@ -44,3 +50,13 @@ def logged_in_client(app):
         with client.session_transaction() as sess:
             sess['logged_in'] = True
         yield client
+
+@pytest.fixture
+def create_share(logged_in_client):
+    """通过 /create 创建内容并返回短 ID"""
+    def _create(content, expire_hours='24', **fields):
+        response = logged_in_client.post('/create', data={
+            'content': content, 'expire_hours': expire_hours, **fields
+        })
+        return json.loads(response.data)['short_id']
+    return _create
@@ -37,9 +37,10 @@ class TestLogout:
     
     def test_logout(self, logged_in_client):
         """测试登出功能"""
-        # 确认已登录
+        # 确认已登录（首页为流式响应，需读取完毕以释放请求上下文）
         response = logged_in_client.get('/')
         assert response.status_code == 200
+        response.close()
         
         # 登出
         response = logged_in_client.get('/logout', follow_redirects=True)
@@ -3,7 +3,8 @@ import json
 import pytest
 import os
 import yaml
-from app import config, CONFIG_PATH
+import app as app_module
+from app import config, CONFIG_PATH, validate_config
 
 
 class TestConfigGet:
@@ -85,6 +86,32 @@ class TestConfigUpdate:
         data = json.loads(response.data)
         assert 'error' in data
     
+    @pytest.mark.parametrize('values', [
+        {'id_length': -1},
+        {'id_length': 3},
+        {'id_alphabet': 'ab/c'},
+        {'id_alphabet': 'a?#%'},
+        {'id_alphabet': 'aaaa'},
+    ])
+    def test_update_invalid_id_settings(self, logged_in_client, values):
+        """测试无效的短 ID 长度和字符集被拒绝且不影响当前配置"""
+        before = dict(app_module.config['content'])
+        response = logged_in_client.post('/config',
+            data=json.dumps({'content': values}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 400
+        assert 'error' in json.loads(response.data)
+        assert app_module.config['content'] == before
+
+    def test_validate_config(self):
+        """测试配置校验规则"""
+        assert validate_config({'content': {'id_length': 4, 'id_alphabet': 'ab'}}) is None
+        assert validate_config({'content': {}}) is None
+        assert validate_config({'content': {'id_length': True}}) is not None
+        assert validate_config({'content': {'id_alphabet': ''}}) is not None
+
     def test_update_config_without_login(self, client):
         """测试未登录无法更新配置"""
         response = client.post('/config',
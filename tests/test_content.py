@@ -1,8 +1,9 @@
 """内容管理相关测试"""
 import json
 import pytest
-from datetime import datetime, timedelta
-from app import save_content, get_content, delete_content, list_contents, get_db_connection
+from datetime import datetime, timedelta, timezone
+import app as app_module
+from app import save_content, get_content, delete_content, iter_contents, get_db_connection, config
 
 
 class TestContentCreation:
@@ -33,6 +34,15 @@ class TestContentCreation:
         data = json.loads(response.data)
         assert 'error' in data
     
+    def test_create_invalid_custom_id(self, logged_in_client):
+        """测试自定义链接包含非法字符时创建失败"""
+        response = logged_in_client.post('/create', data={
+            'content': 'Test', 'custom_id': 'bad/id'
+        })
+
+        assert response.status_code == 400
+        assert '字母' in json.loads(response.data)['error']
+
     def test_create_content_without_login(self, client):
         """测试未登录无法创建内容"""
         response = client.post('/create', data={
@@ -129,3 +139,327 @@ class TestContentList:
         html = response.data.decode('utf-8')
         assert 'Title 1' in html
         assert 'Title 2' in html
+
+    def test_index_is_streamed(self, app, logged_in_client):
+        """测试首页以流式响应输出"""
+        logged_in_client.post('/create', data={'content': 'Streamed', 'title': 'Stream Title', 'expire_hours': '24'})
+
+        response = logged_in_client.get('/')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert 'Stream Title' in response.data.decode('utf-8')
+
+    def test_index_stream_is_buffered(self, app, logged_in_client, create_share):
+        """测试流式首页按缓冲块输出，而不是每个模板片段一个块"""
+        for i in range(50):
+            create_share(f'Content {i}', title=f'Row {i}')
+
+        response = logged_in_client.get('/')
+        chunks = list(response.response)
+        html = b''.join(chunks).decode('utf-8')
+
+        assert 'Row 0' in html and 'Row 49' in html
+        # 50 行历史记录约有上千个模板片段，缓冲后只应有少量响应块
+        assert 1 < len(chunks) <= 10
+
+    def test_index_empty_history(self, app, logged_in_client):
+        """测试无历史记录时显示提示"""
+        response = logged_in_client.get('/')
+        assert '暂无历史记录' in response.data.decode('utf-8')
+
+    def test_iter_contents_skips_expired(self, app, create_share):
+        """测试遍历历史记录时按创建倒序输出并跳过过期内容"""
+        first = create_share('First')
+        second = create_share('Second')
+        conn = get_db_connection()
+        conn.execute('UPDATE contents SET expires_at = ? WHERE id = ?',
+                     (datetime.now() - timedelta(hours=1), first))
+        conn.commit()
+        conn.close()
+
+        assert [item['id'] for item in iter_contents()] == [second]
+
+    def test_open_cursor_does_not_block_writes(self, app, create_share):
+        """测试流式渲染期间游标未关闭时仍可写入"""
+        create_share('First')
+        create_share('Second')
+
+        contents = iter_contents()
+        next(contents)
+        try:
+            assert save_content('Written while streaming', '', 24) is not None
+        finally:
+            contents.close()
+
+
+class TestContentPartialUpdate:
+    """追加和局部替换测试"""
+
+    def test_append_content(self, logged_in_client, create_share):
+        """测试追加内容并递增版本号"""
+        short_id = create_share('line1\n')
+
+        response = logged_in_client.post(f'/append/{short_id}', data={'content': 'line2\n'})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['success'] is True
+        assert data['version'] == 2
+
+        assert get_content(short_id)['content'] == 'line1\nline2\n'
+
+    def test_append_version_conflict(self, logged_in_client, create_share):
+        """测试版本号不匹配时追加失败"""
+        short_id = create_share('base')
+        logged_in_client.post(f'/append/{short_id}', data={'content': 'a', 'version': '1'})
+
+        response = logged_in_client.post(f'/append/{short_id}', data={'content': 'b', 'version': '1'})
+        assert response.status_code == 409
+        assert json.loads(response.data)['version'] == 2
+        assert get_content(short_id)['content'] == 'basea'
+
+    def test_append_exceeds_max_size(self, logged_in_client, create_share):
+        """测试追加后超过最大限制被拒绝"""
+        max_size = config['content']['max_content_size']
+        short_id = create_share('x' * max_size)
+
+        response = logged_in_client.post(f'/append/{short_id}', data={'content': 'y'})
+        assert response.status_code == 400
+        assert len(get_content(short_id)['content']) == max_size
+
+    def test_append_nonexistent(self, logged_in_client):
+        """测试追加不存在的内容返回 404"""
+        response = logged_in_client.post('/append/nonexistent123', data={'content': 'x'})
+        assert response.status_code == 404
+
+    def test_replace_range(self, logged_in_client, create_share):
+        """测试替换字节范围"""
+        short_id = create_share('status: 中 ok')
+
+        # "中" 占 3 个字节，位于偏移 8
+        response = logged_in_client.post(f'/replace/{short_id}', data={
+            'offset': '8', 'length': '3', 'content': 'FAIL', 'version': '1'
+        })
+        assert response.status_code == 200
+        assert json.loads(response.data)['version'] == 2
+        assert get_content(short_id)['content'] == 'status: FAIL ok'
+
+    def test_replace_invalid_range(self, logged_in_client, create_share):
+        """测试越界或截断多字节字符的范围被拒绝"""
+        short_id = create_share('中文')
+
+        response = logged_in_client.post(f'/replace/{short_id}', data={
+            'offset': '4', 'length': '10', 'content': 'x'
+        })
+        assert response.status_code == 400
+
+        response = logged_in_client.post(f'/replace/{short_id}', data={
+            'offset': '1', 'length': '1', 'content': 'x'
+        })
+        assert response.status_code == 400
+        assert get_content(short_id)['content'] == '中文'
+
+    def test_replace_to_empty_rejected(self, logged_in_client, create_share):
+        """测试替换后内容为空被拒绝"""
+        short_id = create_share('abc')
+
+        response = logged_in_client.post(f'/replace/{short_id}', data={
+            'offset': '0', 'length': '3', 'content': ''
+        })
+        assert response.status_code == 400
+        assert get_content(short_id)['content'] == 'abc'
+
+    def test_size_tracked_across_writes(self, logged_in_client, create_share):
+        """测试 size 列随追加和替换同步更新"""
+        short_id = create_share('中')
+        logged_in_client.post(f'/append/{short_id}', data={'content': 'ab'})
+        logged_in_client.post(f'/replace/{short_id}', data={'offset': '3', 'length': '1', 'content': '文'})
+
+        content = get_content(short_id)
+        assert content['content'] == '中文b'
+        assert content['size'] == len('中文b'.encode('utf-8'))
+
+    def test_append_writes_only_delta(self, logged_in_client, create_share):
+        """测试追加时只写入增量数据，不重写正文（按 WAL 帧数统计写入页数）"""
+        short_id = create_share('x' * 500 * 1024)
+        # version 从 1 变为 2 时记录长度变化（SQLite 对 0/1 使用零字节编码），首次追加会整行重写一次
+        logged_in_client.post(f'/append/{short_id}', data={'content': 'warm up\n'})
+        conn = get_db_connection()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        response = logged_in_client.post(f'/append/{short_id}', data={'content': 'status line\n'})
+        assert response.status_code == 200
+
+        _, wal_frames, _ = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        conn.close()
+        # 500 KB 正文约占 120 多页，只写增量时仅涉及少量页
+        assert wal_frames < 10
+        assert get_content(short_id)['content'].endswith('x' * 10 + 'warm up\nstatus line\n')
+
+    def test_append_chunks_compacted(self, logged_in_client, create_share, monkeypatch):
+        """测试追加块达到阈值后合并回正文"""
+        monkeypatch.setattr(app_module, 'CHUNK_COMPACT_THRESHOLD', 3)
+        short_id = create_share('a')
+        for data in ('b', 'c', 'd', 'e'):
+            logged_in_client.post(f'/append/{short_id}', data={'content': data})
+
+        conn = get_db_connection()
+        base = conn.execute('SELECT content FROM contents WHERE id = ?', (short_id,)).fetchone()[0]
+        chunks = conn.execute('SELECT COUNT(*) FROM content_chunks WHERE content_id = ?', (short_id,)).fetchone()[0]
+        conn.close()
+
+        assert base == 'abcd'
+        assert chunks == 1
+        assert get_content(short_id)['content'] == 'abcde'
+
+    def test_chunks_cleared_on_update_and_delete(self, logged_in_client, create_share):
+        """测试整体更新和删除时清理追加块"""
+        short_id = create_share('a')
+        logged_in_client.post(f'/append/{short_id}', data={'content': 'b'})
+        logged_in_client.post(f'/update/{short_id}', data={'content': 'new', 'expire_hours': '24'})
+        assert get_content(short_id)['content'] == 'new'
+
+        logged_in_client.post(f'/append/{short_id}', data={'content': '+'})
+        logged_in_client.post(f'/delete/{short_id}')
+        conn = get_db_connection()
+        chunks = conn.execute('SELECT COUNT(*) FROM content_chunks WHERE content_id = ?', (short_id,)).fetchone()[0]
+        conn.close()
+        assert chunks == 0
+
+    def test_partial_update_without_login(self, client):
+        """测试未登录无法追加或替换"""
+        assert client.post('/append/someid', data={'content': 'x'}).status_code == 302
+        assert client.post('/replace/someid', data={'content': 'x'}).status_code == 302
+
+
+class TestContentCaching:
+    """HTTP 缓存校验测试"""
+
+    def _backdate(self, short_id, seconds=10):
+        """将最后修改时间提前，模拟早于当前秒的写入"""
+        updated_at = datetime.now(timezone.utc) - timedelta(seconds=seconds)
+        conn = get_db_connection()
+        conn.execute('UPDATE contents SET updated_at = ? WHERE id = ?',
+                     (updated_at.strftime('%Y-%m-%d %H:%M:%S.%f'), short_id))
+        conn.commit()
+        conn.close()
+
+    def test_view_sets_cache_headers(self, client, create_share):
+        """测试查看内容返回 ETag、Last-Modified 和 Cache-Control"""
+        short_id = create_share('Cache me')
+        self._backdate(short_id)
+
+        response = client.get(f'/s/{short_id}')
+        assert response.status_code == 200
+        assert response.headers['ETag'] == f'"{get_content(short_id)["etag"]}"'
+        assert 'Last-Modified' in response.headers
+        assert response.cache_control.public
+        assert response.cache_control.must_revalidate
+        assert response.cache_control.max_age == app_module.config['content']['cache_max_age']
+
+    def test_max_age_capped_by_remaining_lifetime(self, client, create_share, monkeypatch):
+        """测试 max-age 不超过剩余有效期"""
+        monkeypatch.setitem(app_module.config['content'], 'cache_max_age', 7 * 24 * 3600)
+        short_id = create_share('Short lived', expire_hours='1')
+
+        response = client.get(f'/s/{short_id}')
+        assert 3500 < response.cache_control.max_age <= 3600
+
+    def test_zero_cache_max_age_requires_revalidation(self, client, create_share, monkeypatch):
+        """测试 cache_max_age 为 0 时每次都要求重新校验"""
+        monkeypatch.setitem(app_module.config['content'], 'cache_max_age', 0)
+        short_id = create_share('Forever', expire_hours='0')
+
+        response = client.get(f'/s/{short_id}')
+        assert response.cache_control.no_cache
+        assert response.cache_control.max_age is None
+
+    def test_no_last_modified_within_write_second(self, client, create_share):
+        """测试最后写入时间不早于当前秒时不发送 Last-Modified"""
+        short_id = create_share('Fresh')
+        # 写入时间设为稍晚于当前时间，避免测试跨越秒边界
+        self._backdate(short_id, seconds=-2)
+
+        response = client.get(f'/s/{short_id}')
+        assert response.status_code == 200
+        assert 'Last-Modified' not in response.headers
+
+    def test_conditional_get_returns_304(self, client, create_share):
+        """测试 If-None-Match / If-Modified-Since 命中返回 304"""
+        short_id = create_share('Conditional')
+        self._backdate(short_id)
+        response = client.get(f'/s/{short_id}')
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        response = client.get(f'/s/{short_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+
+        response = client.head(f'/s/{short_id}', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+    def test_if_modified_since_after_append(self, client, logged_in_client, create_share):
+        """测试追加后 If-Modified-Since 不会误判为未修改"""
+        short_id = create_share('board\n')
+        self._backdate(short_id)
+        last_modified = client.get(f'/s/{short_id}').headers['Last-Modified']
+
+        logged_in_client.post(f'/append/{short_id}', data={'content': 'line\n'})
+        response = client.get(f'/s/{short_id}', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 200
+        assert response.data == b'board\nline\n'
+
+    def test_etag_changes_on_write(self, client, logged_in_client, create_share):
+        """测试更新和追加后 ETag 变化"""
+        short_id = create_share('v1')
+        etag = client.get(f'/s/{short_id}').headers['ETag']
+
+        logged_in_client.post(f'/append/{short_id}', data={'content': '+'})
+        response = client.get(f'/s/{short_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        etag = response.headers['ETag']
+
+        logged_in_client.post(f'/update/{short_id}', data={'content': 'v2', 'expire_hours': '24'})
+        response = client.get(f'/s/{short_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.data == b'v2'
+
+    def test_view_uses_single_connection(self, client, create_share, monkeypatch):
+        """测试未命中缓存的查看只打开一个数据库连接"""
+        short_id = create_share('One round trip')
+        calls = []
+        original = app_module.get_db_connection
+        monkeypatch.setattr(app_module, 'get_db_connection', lambda: calls.append(1) or original())
+
+        response = client.get(f'/s/{short_id}')
+        assert response.status_code == 200
+        assert response.data == b'One round trip'
+        assert len(calls) == 1
+
+    def test_etag_includes_created_at(self, create_share):
+        """测试 ETag 计入创建时间，删除后重建的同名内容不会复用旧 ETag"""
+        short_id = create_share('Same', custom_id='recreated', title='T')
+        content = get_content(short_id)
+        assert content['etag'] == app_module.compute_etag('Same', 'T', 'raw', content['created_at'])
+        assert content['etag'] != app_module.compute_etag('Same', 'T', 'raw', '2000-01-01 00:00:00')
+
+    def test_etag_changes_on_metadata_update(self, client, logged_in_client, create_share):
+        """测试只修改显示格式或标题时 ETag 也会变化"""
+        short_id = create_share('Same body', title='Old')
+        etag = client.get(f'/s/{short_id}').headers['ETag']
+
+        logged_in_client.post(f'/update/{short_id}', data={
+            'content': 'Same body', 'title': 'Old', 'render_mode': 'html', 'expire_hours': '24'
+        })
+        response = client.get(f'/s/{short_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/html'
+        etag = response.headers['ETag']
+
+        logged_in_client.post(f'/update/{short_id}', data={
+            'content': 'Same body', 'title': 'New', 'render_mode': 'html', 'expire_hours': '24'
+        })
+        response = client.get(f'/s/{short_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
@@ -0,0 +1,60 @@
+"""数据库迁移相关测试"""
+import pytest
+from app import init_db, get_db_connection, get_content, compute_etag
+
+
+@pytest.fixture
+def baseline_db(app):
+    """将测试数据库替换为最初版本的表结构，并写入一条旧数据"""
+    conn = get_db_connection()
+    conn.execute('DROP TABLE contents')
+    conn.execute('''
+        CREATE TABLE contents (
+            id TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP,
+            title TEXT,
+            render_mode TEXT DEFAULT 'raw'
+        )
+    ''')
+    conn.execute(
+        "INSERT INTO contents (id, content, title, created_at) VALUES ('legacy', '旧内容', 'Legacy', '2024-01-01 00:00:00')"
+    )
+    conn.commit()
+    conn.close()
+    init_db()
+    return app
+
+
+class TestBaselineMigration:
+    """从最初表结构升级测试"""
+
+    def test_existing_rows_backfilled(self, baseline_db):
+        """测试旧数据补全 version / etag / updated_at / size"""
+        content = get_content('legacy')
+        assert content['version'] == 1
+        assert content['etag'] == compute_etag('旧内容', 'Legacy', 'raw', '2024-01-01 00:00:00')
+        assert content['updated_at'] == content['created_at']
+        assert content['size'] == len('旧内容'.encode('utf-8'))
+
+    def test_view_existing_row(self, baseline_db, client):
+        """测试升级后可以查看旧数据"""
+        response = client.get('/s/legacy')
+        assert response.status_code == 200
+        assert 'Last-Modified' in response.headers
+
+    def test_create_and_view_after_upgrade(self, baseline_db, client, create_share):
+        """测试升级后新建的内容可以正常查看"""
+        short_id = create_share('new')
+        assert get_content(short_id)['updated_at'] is not None
+
+        response = client.get(f'/s/{short_id}')
+        assert response.status_code == 200
+        assert 'ETag' in response.headers
+
+    def test_init_db_idempotent(self, baseline_db):
+        """测试重复初始化不会报错或改动数据"""
+        before = get_content('legacy')
+        init_db()
+        assert get_content('legacy') == before
@@ -0,0 +1,98 @@
+"""短 ID 分配相关测试"""
+import json
+import os
+import pytest
+import app as app_module
+from app import allocate_short_id, generate_short_id, compute_etag, get_db_connection, DEFAULT_ID_ALPHABET
+
+# 负载测试分配的 ID 数量，可通过环境变量调大（例如 ID_LOAD_TEST_COUNT=2000000）
+ID_LOAD_TEST_COUNT = int(os.environ.get('ID_LOAD_TEST_COUNT', 20000))
+
+VALUES = ('x', None, None, 'raw', compute_etag('x'), '2024-01-01 00:00:00')
+
+
+class TestGenerateShortId:
+    """短 ID 生成测试"""
+
+    def test_default_length_and_alphabet(self, app):
+        """测试默认长度和字符集"""
+        short_id = generate_short_id()
+        assert len(short_id) == 8
+        assert set(short_id) <= set(DEFAULT_ID_ALPHABET)
+
+    def test_custom_length_and_alphabet(self, app):
+        """测试自定义长度和字符集"""
+        short_id = generate_short_id(12, 'abc')
+        assert len(short_id) == 12
+        assert set(short_id) <= set('abc')
+
+
+class TestAllocateShortId:
+    """短 ID 分配测试"""
+
+    def test_retry_on_collision_grows_length(self, app, monkeypatch):
+        """测试 ID 空间饱和时通过重试和增加长度保证唯一"""
+        monkeypatch.setattr(app_module, '_id_length_growth', {})
+        conn = get_db_connection()
+        c = conn.cursor()
+        ids = [allocate_short_id(c, VALUES, length=1, alphabet='ab') for _ in range(20)]
+        conn.commit()
+        conn.close()
+
+        assert len(set(ids)) == len(ids)
+        assert max(len(short_id) for short_id in ids) > 1
+
+    def test_grown_length_is_remembered(self, app, monkeypatch):
+        """测试 ID 空间饱和后增加的长度会用于后续分配"""
+        monkeypatch.setattr(app_module, '_id_length_growth', {})
+        conn = get_db_connection()
+        c = conn.cursor()
+        ids = [allocate_short_id(c, VALUES, length=1, alphabet='ab') for _ in range(3)]
+        growth = app_module._id_length_growth[(1, 'ab')]
+        assert growth >= 1
+
+        short_id = allocate_short_id(c, VALUES, length=1, alphabet='ab')
+        conn.commit()
+        conn.close()
+
+        assert len(short_id) >= 1 + growth
+        assert short_id not in ids
+
+    def test_exhausted_allocation_returns_json_error(self, logged_in_client, monkeypatch):
+        """测试无法分配 ID 时返回 JSON 错误而不是 500"""
+        monkeypatch.setattr(app_module, 'generate_short_id', lambda length=None, alphabet=None: 'taken-id')
+        logged_in_client.post('/create', data={'content': 'First', 'custom_id': 'taken-id'})
+
+        response = logged_in_client.post('/create', data={'content': 'Second'})
+        assert response.status_code == 503
+        assert 'error' in json.loads(response.data)
+
+    @pytest.mark.parametrize('length', [None, 3])
+    def test_load_zero_collisions(self, app, length, monkeypatch):
+        """负载测试：大量分配 ID 无冲突（length=3 时 ID 空间很小，会频繁触发重试）"""
+        monkeypatch.setattr(app_module, '_id_length_growth', {})
+        conn = get_db_connection()
+        c = conn.cursor()
+        ids = [allocate_short_id(c, VALUES, length) for _ in range(ID_LOAD_TEST_COUNT)]
+        conn.commit()
+
+        c.execute('SELECT COUNT(*), COUNT(DISTINCT id) FROM contents')
+        total, distinct = c.fetchone()
+        conn.close()
+
+        assert len(set(ids)) == ID_LOAD_TEST_COUNT
+        assert total == distinct == ID_LOAD_TEST_COUNT
+
+
+class TestCustomId:
+    """自定义 ID 测试"""
+
+    def test_duplicate_custom_id_rejected(self, logged_in_client):
+        """测试重复的自定义 ID 被拒绝"""
+        data = {'content': 'First', 'custom_id': 'my-link', 'expire_hours': '24'}
+        response = logged_in_client.post('/create', data=data)
+        assert json.loads(response.data)['short_id'] == 'my-link'
+
+        response = logged_in_client.post('/create', data={**data, 'content': 'Second'})
+        assert response.status_code == 400
+        assert '已被使用' in json.loads(response.data)['error']